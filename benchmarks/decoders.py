@@ -0,0 +1,58 @@
+"""Сравнение скорости декодеров входящих сообщений.
+
+Запуск из корня репозитория:
+
+    python3 -m benchmarks.decoders
+"""
+
+import timeit
+from typing import cast
+
+import ujson
+
+from simple_logs_sender import base
+from simple_logs_sender import decoders
+
+NUMBER = 100_000
+REPEAT = 5
+
+LINE = (
+    b'{"timestamp":"2025-02-24T22:46:30.596767+03:00","tag":"sls-nginx",'
+    b'"hostname":"my-host","message":"{\\"path\\": \\"/\\", \\"ip\\": \\"46.19.143.26\\", '
+    b'\\"time\\": \\"2025-02-24T22:46:30+03:00\\", \\"user_agent\\": \\"Mozilla/5.0\\", '
+    b'\\"user_id_got\\": \\"-\\", \\"user_id_set\\": \\"-\\", \\"remote_user\\": \\"-\\", '
+    b'\\"request\\": \\"GET / HTTP/1.1\\", \\"status\\": \\"200\\", '
+    b'\\"body_bytes_sent\\": \\"615\\", \\"request_time\\": \\"0.000\\", '
+    b'\\"http_referrer\\": \\"-\\"}"}\n'
+)
+
+
+def legacy_decode(raw_data: bytes) -> base.Payload:
+    """Прежний способ разбора, без проверки полей."""
+    return cast('base.Payload', dict(**ujson.loads(raw_data)))
+
+
+def measure(name: str, func: decoders.Decoder | None = None) -> None:
+    """Замерить и вывести время разбора одной строки."""
+    decode = legacy_decode if func is None else func.decode
+    assert decode(LINE)['tag'] == 'sls-nginx'  # noqa: S101
+    best = min(timeit.repeat(lambda: decode(LINE), number=NUMBER, repeat=REPEAT))
+    print(f'{name:<20} {best / NUMBER * 1e9:8.0f} ns/line')
+
+
+def main() -> None:
+    """Точка входа."""
+    measure('ujson (legacy)')
+
+    for name in decoders.DECODERS:
+        try:
+            decoder = decoders.get_decoder(name)
+        except RuntimeError as exc:
+            print(f'{name:<20} skipped: {exc}')
+            continue
+
+        measure(name, decoder)
+
+
+if __name__ == '__main__':
+    main()
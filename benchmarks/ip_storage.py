@@ -0,0 +1,136 @@
+"""Сравнение хранения IP адресов строками и в компактном виде.
+
+Запуск из корня репозитория:
+
+    python3 -m benchmarks.ip_storage
+
+Память кэша геолокации замеряется всегда. Если задана переменная
+SLS__POSTGRESQL__DB_URL (и установлены зависимости nginx_to_postgres),
+дополнительно сравниваются размер индекса и скорость соединения таблиц
+для varchar и inet. Таблицы временные и удаляются после замера.
+"""
+
+import asyncio
+from collections.abc import Callable
+from collections.abc import Hashable
+import ipaddress
+import os
+import random
+import time
+import tracemalloc
+
+from simple_logs_sender.plugins.nginx_to_geolocation.main import ip_key
+
+CACHE_SIZE = 100_000
+GEO_ROWS = 100_000
+LOG_ROWS = 1_000_000
+REPEAT = 3
+
+LAYOUTS = {
+    'varchar': ('varchar(39)', "host('10.0.0.0'::inet + i)"),
+    'inet': ('inet', "'10.0.0.0'::inet + i"),
+}
+
+
+def random_ips(count: int) -> list[bytes]:
+    """Сгенерировать случайные адреса, четверть из них IPv6."""
+    rnd = random.Random(42)  # noqa: S311
+    ips = []
+
+    for i in range(count):
+        if i % 4:
+            ips.append(str(ipaddress.IPv4Address(rnd.getrandbits(32))).encode())
+        else:
+            ips.append(str(ipaddress.IPv6Address(rnd.getrandbits(128))).encode())
+
+    return ips
+
+
+def measure_cache(name: str, ips: list[bytes], key: Callable[[str], Hashable]) -> None:
+    """Замерить память кэша, включая сами ключи из сообщений."""
+    tracemalloc.start()
+    cache = {key(ip.decode()) for ip in ips}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<20} {size / len(cache):8.1f} bytes/entry')
+
+
+def bench_cache() -> None:
+    """Сравнить память кэша на строках и на упакованных числах."""
+    print(f'Geolocation cache, {CACHE_SIZE} addresses:')
+    ips = random_ips(CACHE_SIZE)
+    measure_cache('str keys', ips, str)
+    measure_cache('int keys', ips, ip_key)
+
+
+async def bench_postgres(db_url: str) -> None:
+    """Сравнить размер индекса и скорость соединения для varchar и inet."""
+    import sqlalchemy as sa  # noqa: PLC0415
+    from sqlalchemy.ext.asyncio import create_async_engine  # noqa: PLC0415
+
+    engine = create_async_engine(url=db_url, echo=False)
+    print(f'PostgreSQL, {GEO_ROWS} addresses, {LOG_ROWS} log rows:')
+
+    async with engine.connect() as conn:
+        for name, (ip_type, expression) in LAYOUTS.items():
+            statements = [
+                f'CREATE TEMP TABLE geo_{name} (ip {ip_type} PRIMARY KEY, city varchar(255))',
+                (
+                    f"INSERT INTO geo_{name} SELECT {expression}, 'city' "  # noqa: S608
+                    f'FROM generate_series(0, {GEO_ROWS} - 1) AS i'
+                ),
+                f'CREATE TEMP TABLE logs_{name} (ip {ip_type} NOT NULL)',
+                (
+                    f'INSERT INTO logs_{name} SELECT {expression} FROM '  # noqa: S608
+                    f'(SELECT j % {GEO_ROWS} AS i FROM generate_series(1, {LOG_ROWS}) AS j) AS s'
+                ),
+                f'CREATE INDEX ON logs_{name} (ip)',
+                f'ANALYZE geo_{name}',
+                f'ANALYZE logs_{name}',
+            ]
+
+            for statement in statements:
+                await conn.execute(sa.text(statement))
+
+            result = await conn.execute(
+                sa.text(
+                    'SELECT sum(pg_relation_size(indexrelid)) FROM pg_index '  # noqa: S608
+                    f"WHERE indrelid IN ('geo_{name}'::regclass, 'logs_{name}'::regclass)"
+                )
+            )
+            index_size = result.scalar_one()
+
+            query = sa.text(
+                f'SELECT count(g.city) FROM logs_{name} AS l '  # noqa: S608
+                f'JOIN geo_{name} AS g ON g.ip = l.ip'
+            )
+            timings = []
+            for _ in range(REPEAT):
+                started = time.perf_counter()
+                await conn.execute(query)
+                timings.append(time.perf_counter() - started)
+
+            print(
+                f'{name:<20} indexes {index_size / 1024 / 1024:8.1f} MiB, '
+                f'join {min(timings) * 1000:8.1f} ms'
+            )
+
+        await conn.rollback()
+
+    await engine.dispose()
+
+
+def main() -> None:
+    """Точка входа."""
+    bench_cache()
+
+    db_url = os.environ.get('SLS__POSTGRESQL__DB_URL')
+
+    if db_url:
+        asyncio.run(bench_postgres(db_url))
+    else:
+        print('SLS__POSTGRESQL__DB_URL is not set, skipping PostgreSQL benchmark')
+
+
+if __name__ == '__main__':
+    main()
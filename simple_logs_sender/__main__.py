@@ -1,5 +1,6 @@
 """Простое приложение, которое перенаправляет логи в другие места."""
 
+import argparse
 import asyncio
 from collections import defaultdict
 import importlib
@@ -7,6 +8,7 @@ import logging
 import os
 from pathlib import Path
 import signal
+import socket
 import sys
 from typing import Any
 
@@ -14,6 +16,9 @@ import nano_settings as ns
 
 from simple_logs_sender import base
 from simple_logs_sender import cfg
+from simple_logs_sender import decoders
+from simple_logs_sender import profiling
+from simple_logs_sender import replay
 from simple_logs_sender import transport
 
 GLOBAL_VARIABLES: dict[str, Any] = {}
@@ -21,35 +26,123 @@ GLOBAL_VARIABLES: dict[str, Any] = {}
 
 async def main():
     """Точка входа."""
+    args = parse_args()
     config = ns.from_env(cfg.Config, env_prefix='SLS')
     logger = get_logger(config)
+    profiler = profiling.Profiler(config, logger)
 
-    add_signal_handlers(logger)
+    add_signal_handlers(logger, profiler)
 
     server = None
+    status = None
     plugins: dict[str, list[base.Plugin]] = {}
 
     try:
         logger.info('Simple logs sender starting')
-        server, plugins = get_server_and_plugins(config, logger)
-        await start_all(server, plugins, logger)
+
+        if args.replay:
+            plugins = get_plugins(config, logger, profiler)
+            await start_plugins(plugins, logger)
+            status = asyncio.create_task(log_status(plugins, logger, config.status_interval))
+            if not await replay_files(args, plugins, logger):
+                sys.exit(1)
+        else:
+            server, plugins = get_server_and_plugins(config, logger, profiler)
+            status = asyncio.create_task(log_status(plugins, logger, config.status_interval))
+            await start_all(server, plugins, logger)
     except (KeyboardInterrupt, asyncio.CancelledError):
         pass
     except Exception:
         logger.exception('Failed to start simple logs sender')
         sys.exit(1)
     finally:
+        if status is not None:
+            status.cancel()
         await stop_all(server, plugins, logger)
 
     logger.info('Simple logs sender stopped')
 
 
+def parse_args() -> argparse.Namespace:
+    """Разобрать аргументы командной строки."""
+    parser = argparse.ArgumentParser(prog='simple_logs_sender', description=__doc__)
+    parser.add_argument(
+        '--replay',
+        nargs='+',
+        metavar='FILE',
+        help='send logs from files (plain or .gz) to plugins instead of starting TCP server',
+    )
+    parser.add_argument('--tag', help='tag to replay files with, required for --replay')
+    parser.add_argument(
+        '--hostname',
+        default=socket.gethostname().lower(),
+        help='hostname to replay files with (default: %(default)s)',
+    )
+    parser.add_argument('--checkpoint', help='file to save and resume replay progress from')
+    parser.add_argument(
+        '--batch-size',
+        type=positive_int,
+        default=1000,
+        help='lines to read and process at once (default: %(default)s)',
+    )
+    args = parser.parse_args()
+
+    if args.replay and not args.tag:
+        parser.error('--tag is required for --replay')
+
+    args.replay = [Path(path).absolute() for path in args.replay or []]
+    return args
+
+
+def positive_int(value: str) -> int:
+    """Разобрать целое число больше нуля."""
+    number = int(value)
+
+    if number <= 0:
+        msg = f'expected a positive integer, got {value}'
+        raise argparse.ArgumentTypeError(msg)
+
+    return number
+
+
+async def replay_files(
+    args: argparse.Namespace,
+    plugins: dict[str, list[base.Plugin]],
+    logger: logging.Logger,
+) -> bool:
+    """Отправить логи из файлов напрямую в плагины."""
+    actual_plugins = plugins.get(args.tag)
+
+    if not actual_plugins:
+        logger.error('No plugins configured for tag %r', args.tag)
+        return False
+
+    replayer = replay.Replayer(
+        actual_plugins,
+        logger,
+        tag=args.tag,
+        hostname=args.hostname,
+        checkpoint=args.checkpoint,
+        batch_size=args.batch_size,
+    )
+    return await replayer.run(args.replay)
+
+
 async def start_all(
     server: transport.TCPServer,
     plugins: dict[str, list[base.Plugin]],
     logger: logging.Logger,
 ) -> None:
     """Включить работу всех компонентов."""
+    await start_plugins(plugins, logger)
+    await server.start_server()
+
+
+async def start_plugins(
+    plugins: dict[str, list[base.Plugin]],
+    logger: logging.Logger,
+) -> None:
+    """Включить работу всех плагинов."""
     already_started: set[str] = set()
 
     for nested_plugins in plugins.values():
@@ -64,8 +157,6 @@ async def start_all(
             finally:
                 already_started.add(plugin.name)
 
-    await server.start_server()
-
 
 async def stop_all(
     server: transport.TCPServer | None,
@@ -95,8 +186,36 @@ async def stop_all(
             sys.exit(1)
 
 
-def add_signal_handlers(logger: logging.Logger) -> None:
-    """Добавить обработки сигналов (нужно для перезагрузки)."""
+async def log_status(
+    plugins: dict[str, list[base.Plugin]],
+    logger: logging.Logger,
+    interval: float,
+) -> None:
+    """Раз в interval секунд выводить в лог состояние ограничителей плагинов."""
+    if interval <= 0:
+        return
+
+    unique_plugins = {
+        plugin.name: plugin for nested_plugins in plugins.values() for plugin in nested_plugins
+    }
+
+    while True:
+        await asyncio.sleep(interval)
+
+        for name, plugin in sorted(unique_plugins.items()):
+            logger.info(
+                'Plugin %r: limit=%s, in_flight=%s, waiting=%s, dropped=%s, sink %s',
+                name,
+                plugin.limiter.current_limit,
+                plugin.limiter.in_flight,
+                plugin.limiter.waiting,
+                plugin.limiter.dropped,
+                'down' if plugin.limiter.is_open else 'up',
+            )
+
+
+def add_signal_handlers(logger: logging.Logger, profiler: profiling.Profiler) -> None:
+    """Добавить обработки сигналов (нужно для перезагрузки и профилирования)."""
     if os.name == 'nt':
         logger.warning('Running on Windows, can stop only using Ctr+C')
         return
@@ -120,6 +239,8 @@ def add_signal_handlers(logger: logging.Logger) -> None:
     for each in [signal.SIGINT, signal.SIGTERM]:
         loop.add_signal_handler(each, lambda _sig=each: asyncio.create_task(shutdown(_sig)))
 
+    loop.add_signal_handler(signal.SIGUSR1, profiler.start_session)
+
 
 def get_logger(config: cfg.Config) -> logging.Logger:
     """Настроить и вернуть логгер.
@@ -145,9 +266,10 @@ def get_logger(config: cfg.Config) -> logging.Logger:
 def get_server_and_plugins(
     config: cfg.Config,
     logger: logging.Logger,
+    profiler: profiling.Profiler | None = None,
 ) -> tuple[transport.TCPServer, dict[str, list[base.Plugin]]]:
     """Настроить и вернуть базовые компоненты - сервер и роутер."""
-    plugins = get_plugins(config, logger)
+    plugins = get_plugins(config, logger, profiler)
 
     server = transport.TCPServer(
         host=config.host,
@@ -155,12 +277,18 @@ def get_server_and_plugins(
         plugins=plugins,
         logger=logger,
         verbose=config.verbose,
+        decoder=decoders.get_decoder(config.decoder),
+        profiler=profiler,
     )
 
     return server, plugins
 
 
-def get_plugins(config: cfg.Config, logger: logging.Logger) -> dict[str, list[base.Plugin]]:
+def get_plugins(
+    config: cfg.Config,
+    logger: logging.Logger,
+    profiler: profiling.Profiler | None = None,
+) -> dict[str, list[base.Plugin]]:
     """Импортировать и вернуть все плагины."""
     plugins: dict[str, list[base.Plugin]] = defaultdict(list)
     all_plugins: set[str] = set()
@@ -178,6 +306,7 @@ def get_plugins(config: cfg.Config, logger: logging.Logger) -> dict[str, list[ba
             try:
                 module = importlib.import_module(f'simple_logs_sender.plugins.{name.lower()}')
                 plugin = module.get_plugin(config, tag)
+                plugin.profiler = profiler
                 plugins[plugin.tag].append(plugin)
             except Exception:
                 logger.exception('Failed to import plugin %r', name)
@@ -1,10 +1,19 @@
 """Описание базовых инструментов."""
 
 import abc
+import asyncio
+from collections.abc import Awaitable
+from collections.abc import Callable
+import logging
+import time
 from typing import Any
 from typing import TypedDict
 
 from simple_logs_sender import cfg
+from simple_logs_sender import limiter
+from simple_logs_sender import profiling
+
+LOG = logging.getLogger(__name__)
 
 
 class Payload(TypedDict):
@@ -16,16 +25,29 @@ class Payload(TypedDict):
     message: str
 
 
+def describe(data: Payload | list[Payload]) -> str:
+    """Описать запрос или пачку запросов для лога."""
+    if isinstance(data, list):
+        return f'batch of {len(data)} payloads'
+    return f'payload {data!r}'
+
+
+class SinkError(Exception):
+    """Приёмник не смог принять данные (недоступен, не отвечает и тому подобное)."""
+
+
 class Plugin(abc.ABC):
     """Базовый вариант плагина."""
 
     name: str = 'base'
+    profiler: profiling.Profiler | None = None
 
     def __init__(self, global_config: cfg.Config, tag: str) -> None:
         """Инициализировать экземпляр."""
         self.global_config = global_config
         self.tag = tag
         self.running = None
+        self.limiter = limiter.AdaptiveLimiter(self.name, global_config)
 
     def __repr__(self) -> str:
         """Вернуть текстовое представление."""
@@ -35,10 +57,81 @@ class Plugin(abc.ABC):
         """Подготовить плагин к работе."""
         self.running = True
 
+    async def handle(self, payload: Payload, *, block: bool = False) -> bool:
+        """Обработать запрос, соблюдая ограничение конкурентности.
+
+        Возвращает False, если запрос был отброшен или приёмник выдал
+        SinkError - только такие ошибки учитываются ограничителем. Прочие
+        ошибки считаются ошибками в данных: сообщение пропускается,
+        повторять такое сообщение бессмысленно, поэтому возвращается True.
+        """
+        return await self._run(self.process, payload, block=block)
+
+    async def handle_batch(self, payloads: list[Payload], *, block: bool = False) -> bool:
+        """Обработать пачку запросов, заняв одно место в ограничителе.
+
+        Возвращает то же, что и handle, но для всей пачки сразу.
+        """
+        return await self._run(self.process_batch, payloads, block=block)
+
+    async def _run(self, func: Callable[[Any], Awaitable[None]], data: Any, *, block: bool) -> bool:
+        """Выполнить обработку, соблюдая ограничение конкурентности."""
+        if not await self.limiter.acquire(block=block):
+            return False
+
+        started = time.perf_counter()
+
+        try:
+            await func(data)
+        except asyncio.CancelledError:
+            self.limiter.abandon()
+            raise
+        except SinkError:
+            LOG.exception('Plugin %r failed to send %s', self.name, describe(data))
+            self._release(started, failed=True)
+            return False
+        except Exception:
+            LOG.exception('Plugin %r skipped invalid %s', self.name, describe(data))
+            self.limiter.abandon()
+            return True
+
+        self._release(started, failed=False)
+        return True
+
+    def _release(self, started: float, *, failed: bool) -> None:
+        """Освободить место в ограничителе, учтя время обработки."""
+        if self.profiler is not None and self.profiler.active:
+            self.profiler.record(f'process:{self.name}', started)
+
+        self.limiter.release(time.perf_counter() - started, failed=failed)
+
     @abc.abstractmethod
     async def process(self, payload: Payload) -> None:
         """Обработать запрос."""
 
+    async def process_batch(self, payloads: list[Payload]) -> None:
+        """Обработать пачку запросов.
+
+        По умолчанию запросы обрабатываются по одному, сообщения, где ошибка
+        в данных, пропускаются. Плагин может переопределить метод, чтобы
+        отправлять всю пачку в приёмник за один раз. При SinkError пачка
+        повторяется целиком, поэтому возможны дубликаты.
+        """
+        for payload in payloads:
+            try:
+                await self.process(payload)
+            except SinkError:
+                raise
+            except Exception:
+                LOG.exception('Plugin %r skipped invalid payload %r', self.name, payload)
+
+    async def flush(self) -> None:  # noqa: B027
+        """Сохранить в приёмнике всё, что плагин держит в памяти.
+
+        Вызывается перед сохранением прогресса повторной отправки.
+        Если сохранить не удалось, выбрасывается SinkError.
+        """
+
     async def stop(self) -> None:
         """Бережно остановить плагин."""
         self.running = False
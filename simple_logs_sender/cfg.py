@@ -20,6 +20,20 @@ class Config(ns.BaseConfig):
     log_file: str = ''
     log_format: str = '%(asctime)s - %(levelname)s - %(message)s'
     verbose: bool = True
+    decoder: Annotated[str, ns.Choices('ujson', 'msgspec')] = 'ujson'
+
+    concurrency_initial: int = 16
+    concurrency_max: int = 256
+    concurrency_latency: float = 0.5
+    concurrency_queue: int = 1024
+    circuit_errors: int = 5
+    circuit_cooldown: float = 10.0
+    status_interval: float = 60.0
+
+    profile_dir: str = './profiles'
+    profile_duration: float = 30.0
+    profile_interval: float = 0.005
+    slow_callback: float = 0.1
 
     plugins_path: str = './plugins'
     plugins: Annotated[dict[str, list[str]], ujson.loads] = field(default_factory=dict)
@@ -0,0 +1,98 @@
+"""Декодеры входящих сообщений."""
+
+import abc
+from typing import TYPE_CHECKING
+
+import ujson
+
+from simple_logs_sender import base
+
+if TYPE_CHECKING:
+    import msgspec
+else:
+    try:
+        import msgspec
+    except ImportError:  # pragma: no cover
+        msgspec = None
+
+REQUIRED_FIELDS = tuple(base.Payload.__annotations__)
+
+
+class DecodeError(ValueError):
+    """Сообщение не удалось разобрать или оно не прошло проверку."""
+
+
+class Decoder(abc.ABC):
+    """Базовый вариант декодера."""
+
+    name: str = 'base'
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление."""
+        return f'Decoder<{self.name}>'
+
+    @abc.abstractmethod
+    def decode(self, raw_data: bytes) -> base.Payload:
+        """Разобрать строку и вернуть проверенное сообщение."""
+
+
+class UjsonDecoder(Decoder):
+    """Декодер на ujson, проверяет поля после разбора."""
+
+    name: str = 'ujson'
+
+    def decode(self, raw_data: bytes) -> base.Payload:
+        """Разобрать строку и вернуть проверенное сообщение."""
+        try:
+            data = ujson.loads(raw_data)
+        except ValueError as exc:
+            msg = f'Invalid JSON: {exc}'
+            raise DecodeError(msg) from exc
+
+        if not isinstance(data, dict):
+            msg = f'Expected an object, got {type(data).__name__}'
+            raise DecodeError(msg)
+
+        for field in REQUIRED_FIELDS:
+            if not isinstance(data.get(field), str):
+                msg = f'Field {field!r} is missing or is not a string'
+                raise DecodeError(msg)
+
+        return base.Payload(
+            timestamp=data['timestamp'],
+            hostname=data['hostname'],
+            tag=data['tag'],
+            message=data['message'],
+        )
+
+
+class MsgspecDecoder(Decoder):
+    """Декодер на msgspec, разбирает и проверяет сообщение за один проход."""
+
+    name: str = 'msgspec'
+
+    def __init__(self) -> None:
+        """Инициализировать экземпляр."""
+        if msgspec is None:
+            msg = 'msgspec is not installed, run: pip3 install .[msgspec]'
+            raise RuntimeError(msg)
+
+        self._decoder = msgspec.json.Decoder(base.Payload)
+
+    def decode(self, raw_data: bytes) -> base.Payload:
+        """Разобрать строку и вернуть проверенное сообщение."""
+        try:
+            return self._decoder.decode(raw_data)
+        except msgspec.DecodeError as exc:
+            raise DecodeError(str(exc)) from exc
+
+
+DECODERS: dict[str, type[Decoder]] = {
+    UjsonDecoder.name: UjsonDecoder,
+    MsgspecDecoder.name: MsgspecDecoder,
+}
+
+
+def get_decoder(name: str) -> Decoder:
+    """Вернуть экземпляр декодера по имени."""
+    return DECODERS[name]()
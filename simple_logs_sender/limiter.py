@@ -0,0 +1,191 @@
+"""Адаптивное ограничение числа одновременных запросов к приёмнику."""
+
+import asyncio
+from collections import deque
+import contextlib
+import logging
+import time
+
+from simple_logs_sender import cfg
+
+LOG = logging.getLogger(__name__)
+
+MIN_LIMIT = 1
+BACKOFF = 0.75
+DROPS_LOG_EVERY = 1000
+
+
+class AdaptiveLimiter:
+    """Ограничитель конкурентности по схеме AIMD.
+
+    Пока приёмник отвечает быстрее concurrency_latency секунд, лимит
+    растёт примерно на единицу за каждый полный круг запросов. Медленный
+    ответ или ошибка уменьшают лимит в BACKOFF раз (не чаще раза за
+    concurrency_latency секунд). Запросы сверх лимита ждут в очереди,
+    при заполненной очереди - отбрасываются. После circuit_errors ошибок
+    подряд приёмник считается недоступным, и в течение circuit_cooldown
+    секунд запросы отклоняются сразу, после чего пропускается пробный.
+    """
+
+    def __init__(self, name: str, config: cfg.Config) -> None:
+        """Инициализировать экземпляр."""
+        self.name = name
+        self.max_limit = max(MIN_LIMIT, config.concurrency_max)
+        self.limit = float(min(self.max_limit, max(MIN_LIMIT, config.concurrency_initial)))
+        self.latency_target = config.concurrency_latency
+        self.queue_size = config.concurrency_queue
+        self.circuit_errors = config.circuit_errors
+        self.circuit_cooldown = config.circuit_cooldown
+        self.in_flight = 0
+        self.dropped = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._errors = 0
+        self._last_decrease = 0.0
+        self._open_until = 0.0
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление."""
+        return (
+            f'AdaptiveLimiter<{self.name}, limit={self.current_limit}, '
+            f'in_flight={self.in_flight}, waiting={self.waiting}>'
+        )
+
+    @property
+    def current_limit(self) -> int:
+        """Текущее допустимое число одновременных запросов."""
+        return max(MIN_LIMIT, int(self.limit))
+
+    @property
+    def waiting(self) -> int:
+        """Число запросов, ждущих свободного места."""
+        return len(self._waiters)
+
+    @property
+    def is_open(self) -> bool:
+        """Вернуть True, если приёмник сейчас считается недоступным."""
+        return time.monotonic() < self._open_until
+
+    @property
+    def cooldown_left(self) -> float:
+        """Сколько секунд приёмник ещё будет считаться недоступным."""
+        return max(0.0, self._open_until - time.monotonic())
+
+    async def acquire(self, *, block: bool = False) -> bool:
+        """Занять место для запроса.
+
+        Возвращает False, если запрос отброшен. При block=True запрос
+        не отбрасывается: вызов ждёт свободного места, пока приёмник
+        недоступен - ещё и окончания circuit_cooldown.
+        """
+        while True:
+            delay = self.cooldown_left
+
+            if delay > 0:
+                if not block:
+                    self._drop()
+                    return False
+                await asyncio.sleep(delay)
+                continue
+
+            if not self._waiters and self.in_flight < self.current_limit:
+                self.in_flight += 1
+                return True
+
+            if not block and len(self._waiters) >= self.queue_size:
+                self._drop()
+                return False
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # место уже было отдано нам, возвращаем его
+                    self.abandon()
+                else:
+                    with contextlib.suppress(ValueError):
+                        self._waiters.remove(waiter)
+                raise
+
+            if not self.is_open:
+                return True
+
+            # пока ждали, приёмник стал недоступен
+            self.abandon()
+
+            if not block:
+                self._drop()
+                return False
+
+    def release(self, latency: float, *, failed: bool) -> None:
+        """Освободить место и подстроить лимит по результату запроса."""
+        self.in_flight -= 1
+
+        if failed:
+            self._errors += 1
+            self._decrease()
+
+            if self._errors >= self.circuit_errors and not self.is_open:
+                self._open()
+
+        else:
+            if self._errors >= self.circuit_errors:
+                LOG.info('Sink of %r is available again', self.name)
+
+            self._errors = 0
+
+            if latency > self.latency_target:
+                self._decrease()
+            elif self.in_flight + 1 >= self.current_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        self._wake_up()
+
+    def abandon(self) -> None:
+        """Освободить место без оценки состояния приёмника."""
+        self.in_flight -= 1
+        self._wake_up()
+
+    def _decrease(self) -> None:
+        """Уменьшить лимит, но не чаще раза за latency_target секунд."""
+        now = time.monotonic()
+
+        if now - self._last_decrease < self.latency_target:
+            return
+
+        self._last_decrease = now
+        self.limit = max(MIN_LIMIT, self.limit * BACKOFF)
+
+    def _open(self) -> None:
+        """Считать приёмник недоступным на время circuit_cooldown."""
+        self._open_until = time.monotonic() + self.circuit_cooldown
+        self.limit = MIN_LIMIT
+        LOG.warning(
+            'Sink of %r failed %s times in a row, rejecting payloads for %s seconds',
+            self.name,
+            self._errors,
+            self.circuit_cooldown,
+        )
+
+    def _wake_up(self) -> None:
+        """Отдать освободившиеся места ожидающим запросам."""
+        while self._waiters and self.in_flight < self.current_limit:
+            waiter = self._waiters.popleft()
+
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    def _drop(self) -> None:
+        """Учесть отброшенный запрос."""
+        self.dropped += 1
+
+        if self.dropped % DROPS_LOG_EVERY == 1:
+            LOG.warning(
+                'Sink of %r is saturated or down (limit %s), dropped %s payloads so far',
+                self.name,
+                self.current_limit,
+                self.dropped,
+            )
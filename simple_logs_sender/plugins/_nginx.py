@@ -0,0 +1,55 @@
+"""Общие инструменты плагинов для логов NGINX."""
+
+from typing import Any
+
+import iso8601
+import ujson
+
+from simple_logs_sender import base
+
+
+def maybe_str(string: str) -> str | None:
+    """Попытаться преобразовать в нормальную строку."""
+    return string if string != '-' else None
+
+
+def parse_record(payload: base.Payload) -> dict[str, Any]:
+    """Собрать запись лога из сообщения.
+
+    Пример сырого сообщения:
+    {
+        'timestamp': '2025-02-24T22:46:30.596767+03:00',
+        'tag': 'sls-nginx',
+        'hostname': 'my-host',
+        'message': '{"path": "/",
+                    "ip": "46.19.143.26",
+                    "time": "2025-02-24T22:46:30+03:00",
+                    "user_agent": "-",
+                    "user_id_got": "-",
+                    "user_id_set": "-",
+                    "remote_user": "-",
+                    "request": "GET / HTTP/1.1",
+                    "status": "200",
+                    "body_bytes_sent": "615",
+                    "request_time": "0.000",
+                    "http_referrer": "-"}'
+    }
+    """
+    message = ujson.loads(payload['message'])
+
+    return {
+        'hostname': payload['hostname'],
+        'ip': message['ip'],
+        'path': message['path'],
+        'time': iso8601.parse_date(message['time']),
+        'user_agent': maybe_str(message['user_agent']),
+        'user_id_got': maybe_str(message['user_id_got']),
+        'user_id_set': maybe_str(message['user_id_set']),
+        'remote_user': maybe_str(message['remote_user']),
+        'request': message['request'],
+        'method': str(message['request']).split(' ', maxsplit=1)[0],
+        'status': int(message['status']),
+        'body_bytes_sent': int(message['body_bytes_sent']),
+        'request_time': float(message['request_time']),
+        'http_referrer': maybe_str(message['http_referrer']),
+    }
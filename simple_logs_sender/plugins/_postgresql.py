@@ -0,0 +1,13 @@
+"""Общие инструменты плагинов, которые пишут в PostgreSQL."""
+
+import asyncio
+
+import sqlalchemy as sa
+
+SINK_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    sa.exc.TimeoutError,
+    sa.exc.OperationalError,
+    sa.exc.InterfaceError,
+)
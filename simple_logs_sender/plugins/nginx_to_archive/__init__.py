@@ -0,0 +1,17 @@
+"""Интерфейс получения экземпляра."""
+
+import nano_settings as ns
+
+from simple_logs_sender import cfg
+from simple_logs_sender.plugins.nginx_to_archive import local_cfg
+from simple_logs_sender.plugins.nginx_to_archive.main import NginxToArchivePlugin
+
+
+def get_plugin(global_config: cfg.Config, tag: str) -> NginxToArchivePlugin:
+    """Вернуть экземпляр плагина."""
+    config = ns.from_env(local_cfg.ArchiveConfig, env_prefix='SLS__ARCHIVE')
+    return NginxToArchivePlugin(
+        global_config=global_config,
+        config=config,
+        tag=tag,
+    )
@@ -0,0 +1,18 @@
+"""Конфигурация плагина."""
+
+from dataclasses import dataclass
+from typing import Annotated
+
+import nano_settings as ns
+
+
+@dataclass
+class ArchiveConfig(ns.BaseConfig):
+    """Конфигурация плагина."""
+
+    path: str
+    file_format: Annotated[str, ns.Choices('parquet', 'arrow', 'ndjson')] = 'parquet'
+    batch_size: int = 50_000
+    max_file_rows: int = 1_000_000
+    flush_interval: float = 60.0
+    compression_level: int = 3
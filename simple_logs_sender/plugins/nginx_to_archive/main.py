@@ -0,0 +1,356 @@
+"""Плагин для складывания логов в локальные файлы архива."""
+
+import asyncio
+from collections import defaultdict
+import contextlib
+from datetime import datetime
+from datetime import timezone
+import logging
+import os
+from pathlib import Path
+import re
+import time
+from typing import Any
+import uuid
+
+import ujson
+import zstandard
+
+from simple_logs_sender import base
+from simple_logs_sender import cfg
+from simple_logs_sender.plugins import _nginx
+from simple_logs_sender.plugins.nginx_to_archive import local_cfg
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+LOG = logging.getLogger(__name__)
+
+EXTENSIONS = {
+    'parquet': 'parquet',
+    'arrow': 'arrow',
+    'ndjson': 'ndjson.zst',
+}
+
+
+def get_schema() -> 'pa.Schema':
+    """Вернуть схему таблицы, повторяет таблицу nginx_logs."""
+    return pa.schema(
+        [
+            ('hostname', pa.string()),
+            ('ip', pa.string()),
+            ('path', pa.string()),
+            ('time', pa.timestamp('us', tz='UTC')),
+            ('user_agent', pa.string()),
+            ('user_id_got', pa.string()),
+            ('user_id_set', pa.string()),
+            ('remote_user', pa.string()),
+            ('request', pa.string()),
+            ('method', pa.string()),
+            ('status', pa.int32()),
+            ('body_bytes_sent', pa.int64()),
+            ('request_time', pa.float64()),
+            ('http_referrer', pa.string()),
+        ]
+    )
+
+
+def get_partition(record: dict[str, Any]) -> tuple[str, str]:
+    """Вернуть ключ партиции записи - имя хоста и час в UTC.
+
+    Имя хоста становится именем каталога, поэтому из него убираются
+    разделители путей и ведущие точки (иначе '..' вывело бы за корень).
+    """
+    hostname = re.sub(r'[^\w.-]', '_', record['hostname'])
+    hostname = re.sub(r'^\.+', '_', hostname) or '_'
+    hour = record['time'].astimezone(timezone.utc).strftime('%Y-%m-%d/%H')
+    return hostname, hour
+
+
+def current_hour() -> str:
+    """Вернуть текущий час в UTC в формате ключа партиции."""
+    return datetime.now(tz=timezone.utc).strftime('%Y-%m-%d/%H')
+
+
+class PartitionWriter:
+    """Открытый файл архива одной партиции.
+
+    Каждый вызов write добавляет в файл одну группу строк. Пока файл
+    не закрыт, он лежит под временным именем и читателям не виден.
+    """
+
+    def __init__(self, directory: Path, file_format: str, compression_level: int) -> None:
+        """Инициализировать экземпляр."""
+        moment = datetime.now(tz=timezone.utc).strftime('%Y%m%dT%H%M%S')
+        name = f'part-{moment}-{uuid.uuid4().hex[:8]}.{EXTENSIONS[file_format]}'
+        self.directory = directory
+        self.path = directory / name
+        self.tmp_path = directory / f'.{name}.tmp'
+        self.file_format = file_format
+        self.compression_level = compression_level
+        self.rows = 0
+        self._sink: Any = None
+        self._writer: Any = None
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        """Дописать записи в файл одной группой строк."""
+        if self._writer is None:
+            self._open()
+
+        if self.file_format == 'ndjson':
+            lines = [
+                ujson.dumps(
+                    {**record, 'time': record['time'].isoformat()},
+                    ensure_ascii=False,
+                    escape_forward_slashes=False,
+                )
+                for record in records
+            ]
+            self._writer.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        else:
+            table = pa.Table.from_pylist(records, schema=get_schema())
+            if self.file_format == 'parquet':
+                self._writer.write_table(table, row_group_size=len(records))
+            else:
+                self._writer.write_table(table)
+
+        self.rows += len(records)
+
+    def close(self) -> Path:
+        """Закрыть файл и атомарно переименовать в постоянное имя."""
+        try:
+            self._writer.close()
+            if self._sink is not None:
+                self._sink.close()
+            os.replace(self.tmp_path, self.path)
+        finally:
+            self.tmp_path.unlink(missing_ok=True)
+
+        return self.path
+
+    def discard(self) -> None:
+        """Удалить файл, в который не удалось ничего записать."""
+        try:
+            with contextlib.suppress(Exception):
+                if self._writer is not None:
+                    self._writer.close()
+                if self._sink is not None:
+                    self._sink.close()
+        finally:
+            self.tmp_path.unlink(missing_ok=True)
+
+    def _open(self) -> None:
+        """Создать временный файл и открыть в нём писателя нужного формата."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        if self.file_format == 'ndjson':
+            compressor = zstandard.ZstdCompressor(level=self.compression_level)
+            self._writer = compressor.stream_writer(open(self.tmp_path, 'wb'))  # noqa: SIM115
+        elif self.file_format == 'parquet':
+            self._writer = pq.ParquetWriter(
+                self.tmp_path,
+                get_schema(),
+                compression='zstd',
+                compression_level=self.compression_level,
+            )
+        else:
+            options = pa.ipc.IpcWriteOptions(
+                compression=pa.Codec('zstd', compression_level=self.compression_level),
+            )
+            self._sink = pa.OSFile(str(self.tmp_path), 'wb')
+            self._writer = pa.ipc.new_file(self._sink, get_schema(), options=options)
+
+
+class NginxToArchivePlugin(base.Plugin):
+    """Плагин для складывания логов в локальные файлы архива.
+
+    Записи копятся в памяти отдельно для каждой пары хост + час. Когда
+    набирается batch_size записей, они дописываются одной группой строк
+    в открытый файл партиции. Файл закрывается и атомарно появляется
+    на своём месте, когда в нём max_file_rows записей или когда час
+    партиции прошёл и новых записей нет дольше flush_interval секунд.
+    Если записать не удалось, записи остаются в памяти; следующая
+    попытка будет не раньше чем через circuit_cooldown секунд. До тех
+    пор запросы в заполненную партицию отклоняются (SinkError).
+    """
+
+    name: str = 'nginx_to_archive'
+
+    def __init__(
+        self,
+        global_config: cfg.Config,
+        config: local_cfg.ArchiveConfig,
+        tag: str,
+    ) -> None:
+        """Инициализировать экземпляр."""
+        super().__init__(global_config, tag)
+        self.config = config
+        self.file_format = config.file_format
+        self._root = Path(config.path)
+        self._batches: dict[tuple[str, str], list[dict[str, Any]]] = defaultdict(list)
+        self._writers: dict[tuple[str, str], PartitionWriter] = {}
+        self._touched: dict[tuple[str, str], float] = {}
+        self._lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+        self._retry_at = 0.0
+
+    async def start(self, global_variables: dict[str, Any]) -> None:
+        """Подготовить плагин к работе."""
+        await super().start(global_variables)
+
+        if self.file_format != 'ndjson' and pa is None:
+            LOG.warning('pyarrow is not installed, falling back to ndjson')
+            self.file_format = 'ndjson'
+
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._flusher = asyncio.create_task(self._close_idle_periodically())
+        LOG.info('Nginx -> archive plugin started, writing %s to %s', self.file_format, self._root)
+
+    async def process(self, payload: base.Payload) -> None:
+        """Обработать запрос."""
+        record = _nginx.parse_record(payload)
+        key = get_partition(record)
+        batch = self._batches[key]
+
+        if len(batch) >= self.config.batch_size and time.monotonic() < self._retry_at:
+            msg = f'Archive partition {key[0]}/{key[1]} is full and cannot be written yet'
+            raise base.SinkError(msg)
+
+        batch.append(record)
+        self._touched[key] = time.monotonic()
+
+        if len(batch) < self.config.batch_size:
+            return
+
+        async with self._lock:
+            if len(self._batches[key]) < self.config.batch_size:
+                # пока ждали, пачку уже записали
+                return
+
+            if time.monotonic() >= self._retry_at and await self._write_batch(key):
+                return
+
+            # запись не принята, вызывающий может повторить её сам
+            with contextlib.suppress(ValueError):
+                self._batches[key].remove(record)
+
+        msg = f'Failed to write archive partition {key[0]}/{key[1]}'
+        raise base.SinkError(msg)
+
+    async def flush(self) -> None:
+        """Записать накопленные записи и закрыть файлы всех партиций."""
+        async with self._lock:
+            saved = [
+                await self._close_partition(key) for key in set(self._batches) | set(self._writers)
+            ]
+
+        if not all(saved):
+            pending = sum(len(records) for records in self._batches.values())
+            msg = f'Failed to save some archive files, {pending} records are still in memory'
+            raise base.SinkError(msg)
+
+    async def stop(self) -> None:
+        """Бережно остановить плагин."""
+        await super().stop()
+
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flusher
+
+        try:
+            await self.flush()
+        except base.SinkError as exc:
+            LOG.error('Stopping with unsaved data: %s', exc)
+
+        LOG.info('Nginx -> archive plugin stopped')
+
+    async def _close_idle_periodically(self) -> None:
+        """Закрывать файлы партиций, час которых прошёл."""
+        while True:
+            await asyncio.sleep(self.config.flush_interval)
+            threshold = time.monotonic() - self.config.flush_interval
+            hour = current_hour()
+
+            async with self._lock:
+                for key in set(self._batches) | set(self._writers):
+                    if key[1] != hour and self._touched.get(key, 0.0) <= threshold:
+                        await self._close_partition(key)
+
+    async def _write_batch(self, key: tuple[str, str]) -> bool:
+        """Дописать накопленные записи партиции в её файл.
+
+        При ошибке записи записи возвращаются в память, уже записанная
+        часть файла сохраняется.
+        """
+        records = self._batches.pop(key, None)
+
+        if not records:
+            return True
+
+        writer = self._writers.get(key)
+
+        if writer is None:
+            hostname, hour = key
+            writer = PartitionWriter(
+                self._root / hostname / hour,
+                self.file_format,
+                self.config.compression_level,
+            )
+            self._writers[key] = writer
+
+        try:
+            await asyncio.to_thread(writer.write, records)
+        except Exception as exc:
+            LOG.exception(
+                'Failed to write %s records to %s, will retry, error: %s',
+                len(records),
+                writer.tmp_path,
+                exc,  # noqa: TRY401
+            )
+            self._batches[key] = records + self._batches.get(key, [])
+            self._retry_at = time.monotonic() + self.global_config.circuit_cooldown
+            await self._close_writer(key)
+            return False
+
+        if writer.rows >= self.config.max_file_rows:
+            await self._close_writer(key)
+
+        return True
+
+    async def _close_partition(self, key: tuple[str, str]) -> bool:
+        """Дописать остаток партиции и закрыть её файл."""
+        if not await self._write_batch(key):
+            return False
+
+        self._touched.pop(key, None)
+        return await self._close_writer(key)
+
+    async def _close_writer(self, key: tuple[str, str]) -> bool:
+        """Закрыть файл партиции, если он открыт."""
+        writer = self._writers.pop(key, None)
+
+        if writer is None:
+            return True
+
+        if not writer.rows:
+            await asyncio.to_thread(writer.discard)
+            return True
+
+        try:
+            path = await asyncio.to_thread(writer.close)
+        except Exception as exc:
+            LOG.exception(
+                'Failed to save %s, %s records lost, error: %s',
+                writer.tmp_path,
+                writer.rows,
+                exc,  # noqa: TRY401
+            )
+            return False
+
+        LOG.info('Saved %s records to %s', writer.rows, path)
+        return True
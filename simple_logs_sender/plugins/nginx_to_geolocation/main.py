@@ -1,21 +1,27 @@
 """Плагин для получения геолокации и пересылки в PostgreSQL."""
 
+import asyncio
+import ipaddress
 import logging
 from typing import Any
 
 import aiohttp
 import iso8601
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import INET
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import declarative_base
 import ujson
 
 from simple_logs_sender import base
 from simple_logs_sender import cfg
+from simple_logs_sender.plugins import _postgresql
 from simple_logs_sender.plugins.nginx_to_geolocation import local_cfg
 
 LOG = logging.getLogger(__name__)
 
+IPV6_FLAG = 1 << 128
+
 Base = declarative_base()
 
 
@@ -24,7 +30,7 @@ class IpGeolocation(Base):
 
     __tablename__ = 'ip_geolocation'
 
-    ip = sa.Column(sa.String(15), nullable=False, index=True, primary_key=True)
+    ip = sa.Column(INET, nullable=False, index=True, primary_key=True)
     updated_at = sa.Column(sa.DateTime(timezone=True), nullable=False)
     country = sa.Column(sa.String(255))
     country_code = sa.Column(sa.String(255))
@@ -40,6 +46,19 @@ class IpGeolocation(Base):
     org_as = sa.Column(sa.String(255))
 
 
+def ip_key(ip: str) -> int:
+    """Упаковать IP адрес в число для кэша.
+
+    Адреса IPv6 помечаются старшим битом, чтобы отличаться от IPv4.
+    """
+    address = ipaddress.ip_address(ip)
+
+    if isinstance(address, ipaddress.IPv6Address):
+        return int(address) | IPV6_FLAG
+
+    return int(address)
+
+
 class NginxToGeolocationPlugin(base.Plugin):
     """Плагин для получения геолокации и пересылки в PostgreSQL."""
 
@@ -54,7 +73,7 @@ class NginxToGeolocationPlugin(base.Plugin):
         """Инициализировать экземпляр."""
         super().__init__(global_config, tag)
         self.config = config
-        self._already_added: set[str] = set()
+        self._already_added: set[int] = set()
         self.global_variables: dict[str, Any] = {}
 
     async def start(self, global_variables: dict[str, Any]) -> None:
@@ -111,7 +130,13 @@ class NginxToGeolocationPlugin(base.Plugin):
         message = ujson.loads(payload['message'])
         ip = message['ip']
 
-        if ip in self._already_added:
+        try:
+            key = ip_key(ip)
+        except ValueError:
+            LOG.error('Got invalid IP %r', ip)
+            return
+
+        if key in self._already_added:
             return
 
         try:
@@ -119,14 +144,11 @@ class NginxToGeolocationPlugin(base.Plugin):
                 aiohttp.ClientSession() as session,
                 session.get(f'http://ip-api.com/json/{ip}', timeout=1.0) as resp,
             ):
+                resp.raise_for_status()
                 geolocation = await resp.json()
-        except Exception as exc:
-            LOG.exception(
-                'Failed to get geolocation for IP %s: %s',
-                ip,
-                exc,  # noqa: TRY401
-            )
-            return
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            msg = f'Failed to get geolocation for IP {ip}: {exc}'
+            raise base.SinkError(msg) from exc
 
         try:
             values = {
@@ -152,38 +174,35 @@ class NginxToGeolocationPlugin(base.Plugin):
             )
             return
 
-        try:
-            insert = pg_insert(IpGeolocation).values(**values)
-
-            stmt = insert.on_conflict_do_update(
-                index_elements=[IpGeolocation.ip],
-                set_={
-                    'updated_at': insert.excluded.updated_at,
-                    'country': insert.excluded.country,
-                    'country_code': insert.excluded.country_code,
-                    'region': insert.excluded.region,
-                    'region_name': insert.excluded.region_name,
-                    'city': insert.excluded.city,
-                    'zip': insert.excluded.zip,
-                    'lat': insert.excluded.lat,
-                    'lon': insert.excluded.lon,
-                    'ip_timezone': insert.excluded.ip_timezone,
-                    'isp': insert.excluded.isp,
-                    'org': insert.excluded.org,
-                    'org_as': insert.excluded.org_as,
-                },
-            )
+        insert = pg_insert(IpGeolocation).values(**values)
+
+        stmt = insert.on_conflict_do_update(
+            index_elements=[IpGeolocation.ip],
+            set_={
+                'updated_at': insert.excluded.updated_at,
+                'country': insert.excluded.country,
+                'country_code': insert.excluded.country_code,
+                'region': insert.excluded.region,
+                'region_name': insert.excluded.region_name,
+                'city': insert.excluded.city,
+                'zip': insert.excluded.zip,
+                'lat': insert.excluded.lat,
+                'lon': insert.excluded.lon,
+                'ip_timezone': insert.excluded.ip_timezone,
+                'isp': insert.excluded.isp,
+                'org': insert.excluded.org,
+                'org_as': insert.excluded.org_as,
+            },
+        )
 
+        try:
             async with engine.begin() as conn:
                 await conn.execute(stmt)
-        except Exception as exc:
-            LOG.exception(
-                'Failed to save record to the database, error: %s, record: %s',
-                exc,  # noqa: TRY401
-                values,
-            )
-        else:
-            self._already_added.add(ip)
+        except _postgresql.SINK_ERRORS as exc:
+            msg = f'Failed to save geolocation for IP {ip} to the database: {exc}'
+            raise base.SinkError(msg) from exc
+
+        self._already_added.add(key)
 
     async def stop(self) -> None:
         """Бережно остановить плагин."""
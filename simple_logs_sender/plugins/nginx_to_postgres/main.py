@@ -1,20 +1,27 @@
 """Плагин для пересылки логов в PostgreSQL."""
 
+import ipaddress
 import logging
 from typing import Any
 
-import iso8601
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import INET
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import declarative_base
-import ujson
 
 from simple_logs_sender import base
 from simple_logs_sender import cfg
+from simple_logs_sender.plugins import _nginx
+from simple_logs_sender.plugins import _postgresql
 from simple_logs_sender.plugins.nginx_to_postgres import local_cfg
 
 LOG = logging.getLogger(__name__)
 
+# у PostgreSQL не больше 32767 параметров на запрос, в строке их 14
+ROWS_PER_INSERT = 1000
+# asyncpg отдаёт ошибки данных как DBAPIError, сбои соединения _insert уже превратил в SinkError
+DATA_ERRORS = (sa.exc.DBAPIError,)
+
 Base = declarative_base()
 
 
@@ -25,7 +32,7 @@ class Logs(Base):
 
     id = sa.Column(sa.BigInteger, primary_key=True, autoincrement=True, index=True)
     hostname = sa.Column(sa.String(255), nullable=False, index=True)
-    ip = sa.Column(sa.String(15), nullable=False)
+    ip = sa.Column(INET, nullable=False)
     path = sa.Column(sa.String(1024), nullable=False)
     time = sa.Column(sa.DateTime(timezone=True), nullable=False, index=True)
     user_agent = sa.Column(sa.String(255), nullable=True)
@@ -40,9 +47,21 @@ class Logs(Base):
     http_referrer = sa.Column(sa.String(255), nullable=True)
 
 
-def maybe_str(string: str) -> str | None:
-    """Попытаться преобразовать в нормальную строку."""
-    return string if string != '-' else None
+def parse_record(payload: base.Payload) -> dict[str, Any]:
+    """Собрать запись лога из сообщения и проверить IP адрес.
+
+    Некорректный адрес база данных всё равно не примет в колонку INET,
+    поэтому такое сообщение сразу отбрасывается с ValueError.
+    """
+    record = _nginx.parse_record(payload)
+
+    try:
+        ipaddress.ip_address(record['ip'])
+    except ValueError as exc:
+        msg = f'Invalid IP address {record["ip"]!r}'
+        raise ValueError(msg) from exc
+
+    return record
 
 
 class NginxToPostgresqlPlugin(base.Plugin):
@@ -76,56 +95,51 @@ class NginxToPostgresqlPlugin(base.Plugin):
         LOG.info('Nginx -> PostgreSQL plugin started')
 
     async def process(self, payload: base.Payload) -> None:
-        """Обработать запрос.
-
-        Пример сырого сообщения:
-        {
-            'timestamp': '2025-02-24T22:46:30.596767+03:00',
-            'tag': 'sls-nginx',
-            'hostname': 'my-host',
-            'message': '{"path": "/",
-                        "ip": "46.19.143.26",
-                        "time": "2025-02-24T22:46:30+03:00",
-                        "user_agent": "-",
-                        "user_id_got": "-",
-                        "user_id_set": "-",
-                        "remote_user": "-",
-                        "request": "GET / HTTP/1.1",
-                        "status": "200",
-                        "body_bytes_sent": "615",
-                        "request_time": "0.000",
-                        "http_referrer": "-"}'
-        }
+        """Обработать запрос."""
+        await self._insert([parse_record(payload)])
+
+    async def process_batch(self, payloads: list[base.Payload]) -> None:
+        """Обработать пачку запросов одной транзакцией.
+
+        Если база отвергла пачку из-за данных, записи вставляются
+        по одной, чтобы потерять только некорректные.
         """
-        message = ujson.loads(payload['message'])
-
-        values = {
-            'hostname': payload['hostname'],
-            'ip': message['ip'],
-            'path': message['path'],
-            'time': iso8601.parse_date(message['time']),
-            'user_agent': maybe_str(message['user_agent']),
-            'user_id_got': maybe_str(message['user_id_got']),
-            'user_id_set': maybe_str(message['user_id_set']),
-            'remote_user': maybe_str(message['remote_user']),
-            'request': message['request'],
-            'method': str(message['request']).split(' ', maxsplit=1)[0],
-            'status': int(message['status']),
-            'body_bytes_sent': int(message['body_bytes_sent']),
-            'request_time': float(message['request_time']),
-            'http_referrer': maybe_str(message['http_referrer']),
-        }
+        values = []
+
+        for payload in payloads:
+            try:
+                values.append(parse_record(payload))
+            except Exception:
+                LOG.exception('Skipped invalid payload %r', payload)
+
+        if not values:
+            return
 
         try:
-            async with self._engine.begin() as conn:
-                stmt = sa.insert(Logs).values(**values)
-                await conn.execute(stmt)
-        except TimeoutError as exc:
-            LOG.exception(
-                'Failed to save record to the database, error: %s, record: %s',
-                exc,  # noqa: TRY401
-                values,
+            await self._insert(values)
+        except DATA_ERRORS:
+            LOG.warning(
+                'Database rejected a batch of %s records, inserting one by one', len(values)
             )
+        else:
+            return
+
+        for record in values:
+            try:
+                await self._insert([record])
+            except DATA_ERRORS:
+                LOG.exception('Failed to save record %s', record)
+
+    async def _insert(self, values: list[dict[str, Any]]) -> None:
+        """Вставить записи многострочными INSERT в одной транзакции."""
+        try:
+            async with self._engine.begin() as conn:
+                for start in range(0, len(values), ROWS_PER_INSERT):
+                    chunk = values[start : start + ROWS_PER_INSERT]
+                    await conn.execute(sa.insert(Logs).values(chunk))
+        except _postgresql.SINK_ERRORS as exc:
+            msg = f'Failed to save {len(values)} records to the database: {exc}'
+            raise base.SinkError(msg) from exc
 
     async def stop(self) -> None:
         """Бережно остановить плагин."""
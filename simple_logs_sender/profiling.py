@@ -0,0 +1,153 @@
+"""Профилирование горячего пути, включаемое на лету."""
+
+import asyncio
+from collections import Counter
+import contextlib
+from datetime import datetime
+from datetime import timezone
+import logging
+from pathlib import Path
+import signal
+import time
+from types import FrameType
+
+from simple_logs_sender import cfg
+
+HEARTBEAT_INTERVAL = 0.05
+
+
+class Profiler:
+    """Сэмплирующий профилировщик, включаемый на заданное время.
+
+    Пока сессия не запущена, горячий путь проверяет только флаг active.
+    Пока сессия идёт:
+    - по таймеру ITIMER_PROF снимаются стеки главного потока;
+    - собираются тайминги этапов обработки (см. record);
+    - фоновая задача каждые HEARTBEAT_INTERVAL секунд замеряет задержку
+      цикла событий (этап loop_lag) и пишет в лог случаи, когда цикл
+      был занят дольше slow_callback секунд.
+    Режим отладки цикла не включается, он слишком замедляет работу.
+    По окончании сессии стеки сохраняются в формате collapsed stacks
+    (подходит для flamegraph.pl и speedscope), сводка по этапам
+    выводится в лог.
+    """
+
+    def __init__(self, config: cfg.Config, logger: logging.Logger) -> None:
+        """Инициализировать экземпляр."""
+        self.logger = logger
+        self.directory = Path(config.profile_dir)
+        self.duration = config.profile_duration
+        self.interval = config.profile_interval
+        self.slow_callback = config.slow_callback
+        self.active = False
+        self._stacks: Counter[str] = Counter()
+        self._spans: dict[str, list[float]] = {}
+        self._heartbeat: asyncio.Task | None = None
+
+    def start_session(self) -> None:
+        """Начать сессию профилирования на duration секунд."""
+        if self.active:
+            self.logger.warning('Profiling session is already running')
+            return
+
+        if not hasattr(signal, 'setitimer'):
+            self.logger.warning('Profiling is not supported on this platform')
+            return
+
+        loop = asyncio.get_running_loop()
+        self._stacks.clear()
+        self._spans.clear()
+
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.active = True
+        self._heartbeat = loop.create_task(self._measure_loop_lag())
+        loop.call_later(self.duration, self.stop_session)
+
+        self.logger.info('Profiling started for %s seconds', self.duration)
+
+    def stop_session(self) -> None:
+        """Закончить сессию профилирования и сохранить результаты."""
+        if not self.active:
+            return
+
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+        self.active = False
+
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+        self._log_spans()
+
+        try:
+            path = self._dump_stacks()
+        except OSError:
+            self.logger.exception('Failed to save profiling results')
+        else:
+            self.logger.info('Profiling finished, stacks saved to %s', path)
+
+    def record(self, stage: str, started: float) -> float:
+        """Запомнить длительность этапа и вернуть текущее время."""
+        now = time.perf_counter()
+        self._add_span(stage, now - started)
+        return now
+
+    async def _measure_loop_lag(self) -> None:
+        """Замерять, насколько позже положенного просыпается цикл событий."""
+        with contextlib.suppress(asyncio.CancelledError):
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+                lag = max(0.0, time.perf_counter() - started - HEARTBEAT_INTERVAL)
+                self._add_span('loop_lag', lag)
+
+                if lag > self.slow_callback:
+                    self.logger.warning('Event loop was blocked for %.3f seconds', lag)
+
+    def _add_span(self, stage: str, elapsed: float) -> None:
+        """Учесть длительность этапа в сводке."""
+        span = self._spans.get(stage)
+
+        if span is None:
+            self._spans[stage] = [1, elapsed, elapsed]
+        else:
+            span[0] += 1
+            span[1] += elapsed
+            span[2] = max(span[2], elapsed)
+
+    def _sample(self, _signum: int, frame: FrameType | None) -> None:
+        """Снять стек главного потока."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+            frame = frame.f_back
+
+        if stack:
+            self._stacks[';'.join(reversed(stack))] += 1
+
+    def _log_spans(self) -> None:
+        """Вывести в лог сводку по этапам обработки."""
+        for stage, (count, total, longest) in sorted(self._spans.items()):
+            self.logger.info(
+                'Stage %s: calls=%d, total=%.3fs, avg=%.6fs, max=%.6fs',
+                stage,
+                count,
+                total,
+                total / count,
+                longest,
+            )
+
+    def _dump_stacks(self) -> Path:
+        """Сохранить собранные стеки в формате collapsed stacks."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        moment = datetime.now(tz=timezone.utc).strftime('%Y%m%dT%H%M%S')
+        path = self.directory / f'sls-{moment}.collapsed'
+
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self._stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+        return path
@@ -0,0 +1,247 @@
+"""Повторная отправка логов из файлов, минуя TCP сервер."""
+
+import asyncio
+from datetime import datetime
+from datetime import timezone
+import gzip
+import io
+import itertools
+import logging
+import os
+from pathlib import Path
+import time
+from typing import BinaryIO
+
+import ujson
+
+from simple_logs_sender import base
+
+BUFFER_SIZE = 1024 * 1024
+PROGRESS_EVERY = 5.0
+CHECKPOINT_EVERY = 60.0
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 1.0
+
+
+def open_log(path: Path) -> BinaryIO:
+    """Открыть файл лога (обычный или gzip), используя большой буфер чтения."""
+    if path.suffix == '.gz':
+        raw = gzip.GzipFile(path, 'rb')
+        return io.BufferedReader(raw, buffer_size=BUFFER_SIZE)  # type: ignore [arg-type]
+    return open(path, 'rb', buffering=BUFFER_SIZE)
+
+
+class Replayer:
+    """Повторная отправка логов из файлов прямо в плагины.
+
+    Файлы читаются пачками по batch_size строк, каждая строка
+    оборачивается в Payload, тег и имя хоста задаются снаружи.
+    Пачка передаётся каждому плагину целиком (см. Plugin.handle_batch),
+    следующая читается, когда предыдущая полностью обработана. Если
+    плагин не смог отправить пачку, она повторяется до MAX_ATTEMPTS раз,
+    после чего повторная отправка останавливается.
+
+    Раз в CHECKPOINT_EVERY секунд и в конце каждого файла плагины
+    сбрасывают накопленные данные (см. Plugin.flush), после чего в файл
+    checkpoint записывается смещение внутри файла (для gzip - в
+    распакованных данных). Повторный запуск, где указан тот же checkpoint,
+    продолжит обработку отсюда. Пачки после последнего сохранения
+    будут отправлены ещё раз, то есть возможны дубликаты, но не потери.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        plugins: list[base.Plugin],
+        logger: logging.Logger,
+        *,
+        tag: str,
+        hostname: str,
+        checkpoint: str | None,
+        batch_size: int,
+    ) -> None:
+        """Инициализировать экземпляр."""
+        self.plugins = plugins
+        self.logger = logger
+        self.tag = tag
+        self.hostname = hostname
+        self.checkpoint = Path(checkpoint) if checkpoint else None
+        self.batch_size = batch_size
+        self.lines = 0
+        self.failed = 0
+        self._started = time.monotonic()
+        self._last_report = self._started
+        self._last_checkpoint = self._started
+
+    async def run(self, paths: list[Path]) -> bool:
+        """Отправить в плагины содержимое всех файлов.
+
+        Возвращает False, если отправка была остановлена из-за ошибок.
+        """
+        offsets = self._load_checkpoint()
+        self._started = time.monotonic()
+        self._last_checkpoint = self._started
+
+        for path in paths:
+            if not await self._replay_file(path, offsets):
+                return False
+
+        elapsed = time.monotonic() - self._started
+        self.logger.info(
+            'Replay finished: %s lines in %.1f seconds (%.0f lines/s), %s failed',
+            self.lines,
+            elapsed,
+            self.lines / elapsed if elapsed else 0.0,
+            self.failed,
+        )
+        return True
+
+    async def _replay_file(self, path: Path, offsets: dict[str, int]) -> bool:
+        """Отправить в плагины содержимое одного файла."""
+        key = str(path)
+        offset = offsets.get(key, 0)
+
+        with open_log(path) as file:
+            if offset:
+                self.logger.info('Resuming %s from offset %s', path, offset)
+                file.seek(offset)
+            else:
+                self.logger.info('Replaying %s', path)
+
+            while lines := list(itertools.islice(file, self.batch_size)):
+                if not await self._send(lines):
+                    self.logger.error(
+                        'Stopping replay of %s at offset %s, run again to resume',
+                        path,
+                        offset,
+                    )
+                    await self._checkpoint(offsets)
+                    return False
+
+                offset += sum(len(line) for line in lines)
+                offsets[key] = offset
+
+                due = time.monotonic() - self._last_checkpoint >= CHECKPOINT_EVERY
+                if due and not await self._checkpoint(offsets):
+                    return False
+
+                self._report(path, offset)
+
+        self._report(path, offset, force=True)
+        return await self._checkpoint(offsets)
+
+    async def _send(self, lines: list[bytes]) -> bool:
+        """Передать пачку строк всем плагинам и дождаться обработки.
+
+        Возвращает False, если часть сообщений так и не удалось отправить.
+        """
+        timestamp = datetime.now(tz=timezone.utc).isoformat()
+        payloads = []
+
+        for line in lines:
+            message = line.strip()
+
+            if not message:
+                continue
+
+            payloads.append(
+                base.Payload(
+                    timestamp=timestamp,
+                    hostname=self.hostname,
+                    tag=self.tag,
+                    message=message.decode('utf-8', errors='replace'),
+                )
+            )
+
+        self.lines += len(payloads)
+        pending = list(self.plugins)
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            results = await asyncio.gather(
+                *(plugin.handle_batch(payloads, block=True) for plugin in pending)
+            )
+            pending = [plugin for plugin, ok in zip(pending, results, strict=True) if not ok]
+
+            if not pending:
+                return True
+
+            self.logger.warning(
+                'Plugins %s failed to process a batch, attempt %s of %s',
+                [plugin.name for plugin in pending],
+                attempt,
+                MAX_ATTEMPTS,
+            )
+
+            if attempt < MAX_ATTEMPTS:
+                await asyncio.sleep(RETRY_DELAY * attempt)
+
+        self.failed += len(payloads) * len(pending)
+        return False
+
+    async def _checkpoint(self, offsets: dict[str, int]) -> bool:
+        """Дождаться сохранения данных плагинами и записать смещения."""
+        if self.checkpoint is None:
+            return True
+
+        for plugin in self.plugins:
+            try:
+                await plugin.flush()
+            except base.SinkError:
+                self.logger.exception(
+                    'Plugin %r failed to save data, checkpoint is not saved', plugin.name
+                )
+                return False
+
+        self._save_checkpoint(offsets)
+        self._last_checkpoint = time.monotonic()
+        return True
+
+    def _report(self, path: Path, offset: int, *, force: bool = False) -> None:
+        """Вывести в лог прогресс, но не чаще раза в PROGRESS_EVERY секунд."""
+        now = time.monotonic()
+
+        if not force and now - self._last_report < PROGRESS_EVERY:
+            return
+
+        self._last_report = now
+        elapsed = now - self._started
+        self.logger.info(
+            'Replaying %s: offset %s, %s lines (%.0f lines/s), %s failed',
+            path.name,
+            offset,
+            self.lines,
+            self.lines / elapsed if elapsed else 0.0,
+            self.failed,
+        )
+
+    def _load_checkpoint(self) -> dict[str, int]:
+        """Прочитать сохранённые смещения."""
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return {}
+
+        with open(self.checkpoint, encoding='utf-8') as file:
+            try:
+                offsets = ujson.load(file)
+            except ValueError as exc:
+                msg = f'Checkpoint {self.checkpoint} is not valid JSON: {exc}'
+                raise ValueError(msg) from exc
+
+        if not isinstance(offsets, dict) or not all(
+            isinstance(path, str) and type(offset) is int and offset >= 0
+            for path, offset in offsets.items()
+        ):
+            msg = f'Checkpoint {self.checkpoint} must map file paths to offsets, got {offsets!r}'
+            raise ValueError(msg)
+
+        return offsets
+
+    def _save_checkpoint(self, offsets: dict[str, int]) -> None:
+        """Атомарно сохранить смещения."""
+        if self.checkpoint is None:
+            return
+
+        tmp_path = self.checkpoint.with_name(f'.{self.checkpoint.name}.tmp')
+
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            ujson.dump(offsets, file)
+
+        os.replace(tmp_path, self.checkpoint)
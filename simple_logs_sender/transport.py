@@ -1,19 +1,19 @@
 """Простой TCP сервер, который получает данные от rsyslog."""
 
 import asyncio
-import json
 import logging
 import sys
-
-import ujson
+import time
 
 from simple_logs_sender import base
+from simple_logs_sender import decoders
+from simple_logs_sender import profiling
 
 
 class TCPServer:
     """Простой TCP сервер, который получает данные от rsyslog."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         host: str,
         port: int,
@@ -21,6 +21,8 @@ class TCPServer:
         logger: logging.Logger,
         *,
         verbose: bool,
+        decoder: decoders.Decoder | None = None,
+        profiler: profiling.Profiler | None = None,
     ) -> None:
         """Инициализировать экземпляр."""
         self.host = host
@@ -29,39 +31,42 @@ class TCPServer:
         self.server = None
         self.logger = logger
         self.verbose = verbose
+        self.decoder = decoder or decoders.UjsonDecoder()
+        self.profiler = profiler
         self._tasks: set = set()
 
     async def handle_client(self, reader, writer):
         """Начать обрабатывать входящее соединение."""
         while True:
             try:
+                profiler = self.profiler if self.profiler and self.profiler.active else None
+                started = time.perf_counter() if profiler else 0.0
+
                 raw_data = await reader.readline()
 
                 if not raw_data:
                     break
 
+                if profiler:
+                    # в основном это ожидание новых данных от клиента
+                    started = profiler.record('read_wait', started)
+
                 try:
-                    payload = base.Payload(**ujson.loads(raw_data))
-                except (TypeError, ValueError, json.JSONDecodeError):
-                    self.logger.error('Failed to parse JSON: %r', raw_data)
+                    payload = self.decoder.decode(raw_data)
+                except decoders.DecodeError as exc:
+                    self.logger.error('Failed to decode payload: %s, %r', exc, raw_data)
                     continue
 
-                tag = payload.get('tag')
-
-                if tag is None:
-                    self.logger.error('Incorrect payload structure: %r', raw_data)
-                    continue
+                if profiler:
+                    started = profiler.record('decode', started)
 
                 if self.verbose:
                     self.logger.info('Got message from %(hostname)s with tag %(tag)s', payload)
 
-                actual_plugins = self.plugins.get(tag)
+                self.dispatch(payload)
 
-                if actual_plugins is not None:
-                    for plugin in actual_plugins:
-                        task = asyncio.create_task(plugin.process(payload))
-                        self._tasks.add(task)
-                        task.add_done_callback(lambda _task: self._tasks.discard(_task))
+                if profiler:
+                    profiler.record('dispatch', started)
 
             except Exception:
                 self.logger.exception('Error processing request')
@@ -70,6 +75,18 @@ class TCPServer:
         writer.close()
         await writer.wait_closed()
 
+    def dispatch(self, payload: base.Payload) -> None:
+        """Передать сообщение плагинам, подписанным на этот тег."""
+        actual_plugins = self.plugins.get(payload['tag'])
+
+        if actual_plugins is None:
+            return
+
+        for plugin in actual_plugins:
+            task = asyncio.create_task(plugin.handle(payload))
+            self._tasks.add(task)
+            task.add_done_callback(lambda _task: self._tasks.discard(_task))
+
     async def start_server(self):
         """Запустить TCP сервер."""
         try: